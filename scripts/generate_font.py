@@ -6,7 +6,7 @@ This script takes a JSON file with character mappings and
 generates a font file in the specified format.
 
 Usage:
-  fontforge -script generate_font.py <charmap_file> <output_file> <font_name> [<format>] [<adjustments_file>]
+  fontforge -script generate_font.py [--hint | --no-hint] <charmap_file> <output_file> <font_name> [<format>] [<adjustments_file>]
 
 Arguments:
   charmap_file: Path to the JSON file with character mappings
@@ -14,6 +14,26 @@ Arguments:
   font_name: Name of the font
   format: Font format (ttf, otf, woff, or woff2, default: ttf)
   adjustments_file: Path to the JSON file with font adjustments (optional)
+
+Options:
+  --hint: Auto-hint glyphs for every format
+  --no-hint: Never auto-hint glyphs
+
+By default only ttf and otf output is auto-hinted. WOFF/WOFF2 output is
+meant for browsers, where the hints make no visible difference at typical
+body-text sizes, so skipping them saves the hinting time.
+
+Set FONT_DEBUG=1 in the environment for verbose per-glyph logging.
+
+Character images are traced in parallel FontForge worker processes
+(FONT_TRACE_WORKERS, default: CPU count up to 4; 0 traces in-process).
+A worker that runs longer than FONT_TRACE_TIMEOUT seconds (default: 60)
+is killed and its image is traced in-process instead. Set
+FONTFORGE_BIN if the fontforge executable is not on the PATH. Traced
+outlines are cached by image content in HAPPYFONT_CACHE_DIR (default:
+~/.cache/happyfont), so unchanged images are not traced again. The least
+recently used entries are removed once the cache holds more than
+HAPPYFONT_CACHE_MAX_ENTRIES outlines (default: 2000).
 """
 
 import fontforge
@@ -21,6 +41,31 @@ import json
 import sys
 import os
 import datetime
+import hashlib
+import itertools
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+DEBUG = os.environ.get('FONT_DEBUG') == '1'
+
+# Out-of-process tracing: FontForge executable and number of parallel workers
+FONTFORGE_BIN = os.environ.get('FONTFORGE_BIN', 'fontforge')
+# (capped by default, since the web routes start one script run per request)
+TRACE_WORKERS = int(os.environ.get('FONT_TRACE_WORKERS', min(4, os.cpu_count() or 1)))
+TRACE_TIMEOUT = float(os.environ.get('FONT_TRACE_TIMEOUT', 60))
+
+# Persistent cache of traced outlines; bump the version when tracing changes
+TRACE_CACHE_DIR = os.environ.get('HAPPYFONT_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'happyfont'))
+TRACE_CACHE_VERSION = 2
+TRACE_CACHE_MAX_ENTRIES = int(os.environ.get('HAPPYFONT_CACHE_MAX_ENTRIES', 2000))
 
 # Comprehensive typographic metrics (in font units)
 TYPEFACE_METRICS = {
@@ -56,19 +101,29 @@ TYPEFACE_METRICS = {
 
 # Character width classifications
 CHAR_WIDTH_CLASSES = {
-    'narrow': ['i', 'l', 'I', 'J', 'f', 't', '1'],
-    'medium': ['a', 'b', 'c', 'd', 'e', 'g', 'h', 'j', 'k', 'n', 'o', 'p', 'q', 'r', 's', 'u', 'v', 'x', 'y', 'z',
-               'A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'K', 'L', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'X', 'Y', 'Z',
-               '2', '3', '4', '5', '6', '7', '8', '9', '0'],
-    'wide': ['m', 'w', 'M', 'W']
+    'narrow': frozenset(['i', 'l', 'I', 'J', 'f', 't', '1']),
+    'medium': frozenset(['a', 'b', 'c', 'd', 'e', 'g', 'h', 'j', 'k', 'n', 'o', 'p', 'q', 'r', 's', 'u', 'v', 'x', 'y', 'z',
+                         'A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'K', 'L', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'X', 'Y', 'Z',
+                         '2', '3', '4', '5', '6', '7', '8', '9', '0']),
+    'wide': frozenset(['m', 'w', 'M', 'W'])
 }
 
+# Reverse index of CHAR_WIDTH_CLASSES for constant-time lookups
+CHAR_TO_CLASS = {}
+for width_class, chars in CHAR_WIDTH_CLASSES.items():
+    CHAR_TO_CLASS.update((char, width_class) for char in chars)
+NARROW_SET = CHAR_WIDTH_CLASSES['narrow']
+
 # Comprehensive kerning pairs with optimized values
 DEFAULT_KERNING_PAIRS = {
     # Uppercase combinations
     'AV': -50, 'AW': -50, 'AY': -50, 'Ta': -30, 'Te': -30, 'To': -30, 'Tr': -30, 'Tu': -30,
     'Ty': -30, 'Va': -40, 'Ve': -40, 'Vo': -40, 'Wa': -40, 'We': -40, 'Wo': -40, 'Ya': -40,
-    'Ye': -40, 'Yo': -40, 'FA': -30, 'FE': -30, 'FO': -30, 'Fr': -30, 'FT': -30,
+    'Ye': -40, 'Yo': -40, 'Fr': -30,
+    
+    # Straight-sided combinations (no negative kerning, positive where they collide)
+    'FO': 0, 'FA': 0, 'FE': 0, 'FL': 0, 'IO': 0, 'IA': 0, 'IE': 0, 'IL': 0, 'IN': 0,
+    'FT': 20, 'TF': 20, 'FI': 10, 'IF': 10, 'TI': 10, 'IT': 10, 'TT': 15, 'FF': 15, 'II': 10,
     
     # Lowercase combinations
     'av': -20, 'aw': -20, 'ay': -20, 'fa': -20, 'fe': -20, 'fo': -20, 'fr': -20, 'ft': -20,
@@ -89,141 +144,322 @@ DEFAULT_KERNING_PAIRS = {
 }
 
 # Round characters that need overshoot
-ROUND_CHARS = ['o', 'O', 'e', 'E', 'c', 'C', 'g', 'G', 'p', 'P', 'q', 'Q', 'b', 'B', 'd', 'D']
+ROUND_CHARS = frozenset(['o', 'O', 'e', 'E', 'c', 'C', 'g', 'G', 'p', 'P', 'q', 'Q', 'b', 'B', 'd', 'D'])
+
+# Side-bearing special cases in auto_balance_side_bearings
+F_AND_I = frozenset(['F', 'I'])
+
+# Output formats that are auto-hinted unless hinting is set explicitly
+HINT_FORMATS = frozenset(['ttf', 'otf'])
+
+# Uppercase neighbors checked by the dynamic 'I' kerning pass
+A_TO_Z = tuple(chr(c) for c in range(65, 91))
 
 # Minimum and maximum side bearing (in font units)
 MIN_SIDE_BEARING = 5
 MAX_SIDE_BEARING = 40
 
-# Add/strengthen kerning for FO and similar pairs (less aggressive)
-DEFAULT_KERNING_PAIRS.update({
-    'FO': -10, 'FA': -10, 'FE': -10, 'FI': -10, 'FL': -10,
-    'IO': -10, 'IA': -10, 'IE': -10, 'IL': -10, 'IN': -10
-})
+# List of straight-sided glyphs (prone to collision)
+STRAIGHT_GLYPHS = frozenset(['F', 'I', 'T', 'L', 'E', 'H', 'K', 'Z'])
 
-# Set kerning for FO, FI, IO, etc. to zero (no negative kerning)
+# General safeguard: ensure minimum positive kerning for adjacent straight-sided glyphs
 DEFAULT_KERNING_PAIRS.update({
-    'FO': 0, 'FA': 0, 'FE': 0, 'FI': 0, 'FL': 0,
-    'IO': 0, 'IA': 0, 'IE': 0, 'IL': 0, 'IN': 0
+    left_char + right_char: 10  # Small positive kerning to prevent collision
+    for left_char, right_char in itertools.product(STRAIGHT_GLYPHS, repeat=2)
+    if left_char + right_char not in DEFAULT_KERNING_PAIRS
 })
 
-# Add positive kerning for FT, TF, and other problematic pairs
-DEFAULT_KERNING_PAIRS.update({
-    'FT': 20, 'TF': 20, 'FI': 10, 'IF': 10, 'TI': 10, 'IT': 10,
-    'TT': 15, 'FF': 15, 'II': 10, 'TT': 15
-})
+def get_character_width(char: str) -> str:
+    """Determine the width class of a character."""
+    return CHAR_TO_CLASS.get(char, 'medium')  # Default to medium width
 
-# List of straight-sided glyphs (prone to collision)
-STRAIGHT_GLYPHS = ['F', 'I', 'T', 'L', 'E', 'H', 'K', 'Z']
+def overshoot_offset(char):
+    """Return the vertical overshoot to apply to round characters."""
+    return TYPEFACE_METRICS['overshoot'] if char in ROUND_CHARS else 0
 
-def get_character_width(char):
-    """Determine the width class of a character."""
-    for width_class, chars in CHAR_WIDTH_CLASSES.items():
-        if char in chars:
-            return width_class
-    return 'medium'  # Default to medium width
-
-def apply_overshoot(glyph, char):
-    """Apply overshoot to round characters."""
-    if char in ROUND_CHARS:
-        bbox = glyph.boundingBox()
-        if bbox:
-            # Apply overshoot to top and bottom
-            glyph.transform([1, 0, 0, 1, 0, TYPEFACE_METRICS['overshoot']])
-            return True
-    return False
-
-def auto_balance_side_bearings(glyph, char):
+def auto_balance_side_bearings(glyph: fontforge.glyph, char: str) -> Optional[Tuple[float, float, float]]:
+    """Return (left, right, advance width) with side bearings balanced by character class."""
     bbox = glyph.boundingBox()
     if not bbox:
-        return
+        return None
     width = bbox[2] - bbox[0]
     # Special case for F and I: moderate right side bearing
-    if char in ['F', 'I']:
+    if char in F_AND_I:
         left = max(20, min(int(width * 0.12), 40))
         right = max(25, min(int(width * 0.10), 50))
-        print(f"DEBUG: {char} bbox={bbox}, width={width}, left={left}, right={right}")
-        glyph.left_side_bearing = left
-        glyph.right_side_bearing = right
+        if DEBUG:
+            print(f"DEBUG: {char} bbox={bbox}, width={width}, left={left}, right={right}")
         min_width = bbox[2] + right + 10
-        glyph.width = max(glyph.width, min_width, 350)
-        print(f"DEBUG: {char} final glyph.width={glyph.width}")
+        advance = max(left + width + right, min_width, 350)
+        if DEBUG:
+            print(f"DEBUG: {char} final glyph.width={advance}")
     # Special case for T
     elif char == 'T':
         left = max(20, min(int(width * 0.10), 40))
         right = max(20, min(int(width * 0.10), 40))
-        print(f"DEBUG: {char} bbox={bbox}, width={width}, left={left}, right={right}")
-        glyph.left_side_bearing = left
-        glyph.right_side_bearing = right
+        if DEBUG:
+            print(f"DEBUG: {char} bbox={bbox}, width={width}, left={left}, right={right}")
         min_width = bbox[2] + right + 10
-        glyph.width = max(glyph.width, min_width, 350)
-        print(f"DEBUG: {char} final glyph.width={glyph.width}")
-    elif char in CHAR_WIDTH_CLASSES['narrow']:
-        left = right = max(MIN_SIDE_BEARING, min(int(width * 0.02), MAX_SIDE_BEARING))
-        glyph.left_side_bearing = left
-        glyph.right_side_bearing = right
-    elif char in ROUND_CHARS:
-        left = right = max(MIN_SIDE_BEARING, min(int(width * 0.07), MAX_SIDE_BEARING))
-        glyph.left_side_bearing = left
-        glyph.right_side_bearing = right
+        advance = max(left + width + right, min_width, 350)
+        if DEBUG:
+            print(f"DEBUG: {char} final glyph.width={advance}")
     else:
-        left = right = max(MIN_SIDE_BEARING, min(int(width * 0.05), MAX_SIDE_BEARING))
-        glyph.left_side_bearing = left
-        glyph.right_side_bearing = right
+        if char in NARROW_SET:
+            left = right = max(MIN_SIDE_BEARING, min(int(width * 0.02), MAX_SIDE_BEARING))
+        elif char in ROUND_CHARS:
+            left = right = max(MIN_SIDE_BEARING, min(int(width * 0.07), MAX_SIDE_BEARING))
+        else:
+            left = right = max(MIN_SIDE_BEARING, min(int(width * 0.05), MAX_SIDE_BEARING))
+        # An empty glyph has no outline for the left bearing to move, so the
+        # right bearing is measured from x=0 and is its whole advance
+        advance = left + width + right if any(bbox) else right
+    return left, right, advance
+
+def glyph_extents(glyph: fontforge.glyph) -> Optional[Tuple[float, float, float, float]]:
+    """Return (min_x, max_x, min_y, max_y) of the outline, or None if it is empty."""
+    # boundingBox() is computed in FontForge's C core; an empty glyph reports all zeros
+    min_x, min_y, max_x, max_y = glyph.boundingBox()
+    if min_x == min_y == max_x == max_y == 0:
+        return None
+    return (min_x, max_x, min_y, max_y)
 
-def dynamic_side_bearings(glyph, char):
+def dynamic_side_bearings(glyph: fontforge.glyph, char: str,
+                          bbox_cache: Dict[str, Optional[Tuple[float, float, float, float]]]
+                          ) -> Optional[Tuple[float, float, float]]:
+    """Return (left, right, advance width) for the glyph without modifying it."""
     try:
-        contours = [c for c in glyph.foreground]
-        if not contours:
-            auto_balance_side_bearings(glyph, char)
-            return
-        min_x = min(point.x for contour in contours for point in contour)
-        max_x = max(point.x for contour in contours for point in contour)
+        extents = bbox_cache.get(char)
+        if extents is None:
+            return auto_balance_side_bearings(glyph, char)
+        min_x, max_x = extents[0], extents[1]
         if char == 'I':
             left_bearing = 10  # Much smaller than default
             right_bearing = 10
-            min_width = 60     # Slightly wider than the outline
-            glyph.width = max(left_bearing + (max_x - min_x) + right_bearing, min_width)
         else:
             left_bearing = max(15, min_x)
             right_bearing = 30
             left_bearing = min(left_bearing, 60)
             right_bearing = min(right_bearing, 60)
-            glyph.width = left_bearing + (max_x - min_x) + right_bearing
-        glyph.left_side_bearing = left_bearing
-        glyph.right_side_bearing = right_bearing
-        print(f"DYNAMIC: {char} min_x={min_x}, max_x={max_x}, left={left_bearing}, right={right_bearing}, width={glyph.width}")
+        width = left_bearing + (max_x - min_x) + right_bearing
+        if DEBUG:
+            print(f"DYNAMIC: {char} min_x={min_x}, max_x={max_x}, left={left_bearing}, right={right_bearing}, width={width}")
+        return left_bearing, right_bearing, width
     except Exception as e:
         print(f"DYNAMIC: {char} error in side bearing analysis: {e}")
-        auto_balance_side_bearings(glyph, char)
+        return auto_balance_side_bearings(glyph, char)
 
-# General safeguard: ensure minimum positive kerning for adjacent straight-sided glyphs
-for left_char in STRAIGHT_GLYPHS:
-    for right_char in STRAIGHT_GLYPHS:
-        pair = left_char + right_char
-        if pair not in DEFAULT_KERNING_PAIRS:
-            DEFAULT_KERNING_PAIRS[pair] = 10  # Small positive kerning to prevent collision
-
-def generate_font(charmap_file, output_file, font_name, format="ttf", adjustments_file=None):
-    """Generate a font file from character mappings."""
+def apply_typeface_metrics(font):
+    """Set the em size, ascent/descent and line metrics on a font."""
+    font.em = TYPEFACE_METRICS['units_per_em']
+    font.ascent = TYPEFACE_METRICS['ascender']
+    font.descent = TYPEFACE_METRICS['descender']
+    font.hhea_ascent = TYPEFACE_METRICS['ascender']
+    font.hhea_descent = TYPEFACE_METRICS['descender']
+    font.hhea_linegap = TYPEFACE_METRICS['line_gap']
+    font.os2_winascent = TYPEFACE_METRICS['ascender']
+    font.os2_windescent = TYPEFACE_METRICS['descender']
+    font.os2_typoascent = TYPEFACE_METRICS['ascender']
+    font.os2_typodescent = TYPEFACE_METRICS['descender']
+    font.os2_typolinegap = TYPEFACE_METRICS['line_gap']
+
+def trace_glyph(image_path, outline_path):
+    """Trace a character image and save the outline as a .glif file (worker entry point).
+
+    A blank image traces to no outline; no file is written in that case.
+    """
+    font = fontforge.font()
+    apply_typeface_metrics(font)
+    glyph = font.createChar(-1, "traced")
+    glyph.importOutlines(image_path)
+    glyph.autoTrace()
+    if glyph_extents(glyph) is not None:
+        save_outline(glyph, outline_path)
+
+def save_outline(glyph, outline_path):
+    """Export a glyph outline to the trace cache."""
+    # Write under a temporary name so readers never see a partial file
+    cache_dir, name = os.path.split(outline_path)
+    partial_path = os.path.join(cache_dir, f".partial-{os.getpid()}-{name}")
+    try:
+        glyph.export(partial_path)
+        os.replace(partial_path, outline_path)
+    except OSError:
+        # Don't leave a stray partial file behind in the cache
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+        raise
+
+def load_cached_outline(glyph, outline_path):
+    """Import a cached outline into the glyph and return whether that worked.
+
+    A concurrent run may prune the outline after it was listed; the glyph is
+    left empty in that case so the caller can trace the image instead.
+    """
+    try:
+        glyph.importOutlines(outline_path)
+    except Exception as e:
+        print(f"Warning: Could not load cached outline {outline_path}: {e}")
+        glyph.clear()
+        return False
+    # Mark the outline as recently used, so pruning evicts the least recently used
+    try:
+        os.utime(outline_path)
+    except OSError:
+        pass
+    return True
+
+def prune_trace_cache(cache_dir, max_entries):
+    """Delete the least recently used cached outlines so that at most max_entries remain."""
+    with os.scandir(cache_dir) as entries:
+        outlines = [(entry.stat().st_mtime, entry.path) for entry in entries
+                    if entry.is_file() and entry.name.startswith('v') and entry.name.endswith('.glif')]
+    outlines.sort()
+    for _, path in outlines[:max(len(outlines) - max_entries, 0)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def trace_cache_key(image_path):
+    """Hash an image together with the metrics that affect its traced outline."""
+    digest = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        digest.update(f.read())
+    digest.update(repr((TYPEFACE_METRICS['units_per_em'], TYPEFACE_METRICS['ascender'],
+                        TYPEFACE_METRICS['descender'])).encode())
+    return digest.hexdigest()
+
+def run_trace_worker(image_path, outline_path):
+    """Trace one image in a separate FontForge process and return whether it succeeded."""
+    try:
+        result = subprocess.run(
+            [FONTFORGE_BIN, '-quiet', '-script', os.path.abspath(__file__), '--trace', image_path, outline_path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=TRACE_TIMEOUT, check=False)
+    except subprocess.TimeoutExpired:
+        print(f"Warning: Trace worker for {image_path} timed out after {TRACE_TIMEOUT}s; tracing in-process")
+        return False
+    except OSError as e:
+        print(f"Warning: Could not start trace worker for {image_path}: {e}; tracing in-process")
+        return False
+    if result.returncode != 0:
+        print(f"Warning: Trace worker for {image_path} exited with status {result.returncode}; tracing in-process")
+        return False
+    return True
+
+def open_trace_dir():
+    """Return (directory, temporary directory) to trace outlines into.
+
+    This is the persistent cache when it is writable. Otherwise it is a
+    per-run temporary directory, which the caller must clean up, so the
+    trace workers still run when the cache is unavailable.
+    """
+    try:
+        os.makedirs(TRACE_CACHE_DIR, exist_ok=True)
+        if os.access(TRACE_CACHE_DIR, os.W_OK):
+            return TRACE_CACHE_DIR, None
+        print(f"Warning: Trace cache at {TRACE_CACHE_DIR} is not writable; using a temporary directory")
+    except OSError as e:
+        print(f"Warning: Trace cache unavailable at {TRACE_CACHE_DIR}: {e}; using a temporary directory")
+    temp_dir = tempfile.TemporaryDirectory(prefix="happyfont-trace-")
+    return temp_dir.name, temp_dir
+
+def pretrace_glyphs(image_paths, cache_dir):
+    """Trace uncached character images in parallel.
+
+    Returns a map of image path to outline path, the set of outline paths
+    that exist, and the set of outline paths whose image traced to nothing.
+    Outlines in neither set must be traced by the caller.
+    """
+    # List the cache once instead of checking every outline path
+    with os.scandir(cache_dir) as entries:
+        ready = {entry.path for entry in entries if entry.is_file()}
+    
+    blank = set()
+    outlines = {}
+    pending = {}  # outline path -> image path, so identical images are traced once
+    for image_path in set(image_paths):
+        try:
+            outline_path = os.path.join(cache_dir, f"v{TRACE_CACHE_VERSION}-{trace_cache_key(image_path)}.glif")
+        except OSError:
+            continue
+        outlines[image_path] = outline_path
+        if outline_path not in ready:
+            pending[outline_path] = image_path
+    
+    if pending and TRACE_WORKERS > 0:
+        with ThreadPoolExecutor(max_workers=TRACE_WORKERS) as pool:
+            results = list(pool.map(run_trace_worker, pending.values(), pending.keys()))
+        for outline_path, traced in zip(pending, results):
+            if traced:
+                # A worker that succeeded without writing a file traced a blank image
+                (ready if os.path.exists(outline_path) else blank).add(outline_path)
+        failed = results.count(False)
+        if failed:
+            print(f"Warning: {failed} of {len(results)} trace workers failed")
+    
+    return outlines, ready, blank
+
+def merge_kerning(font, kern_pairs):
+    """Add (left_glyph, right_glyph, value) pairs to the font in a single kern feature.
+
+    The value shifts the left glyph horizontally (x placement).
+    """
+    lines = ["languagesystem latn dflt;", "feature kern {"]
+    lines.extend(f"    pos {left} {right} <{value} 0 0 0>;" for left, right, value in sorted(kern_pairs))
+    lines.append("} kern;")
+    with tempfile.NamedTemporaryFile('w', suffix='.fea', delete=False) as f:
+        f.write("\n".join(lines) + "\n")
+    try:
+        font.mergeFeature(f.name)
+    finally:
+        os.unlink(f.name)
+
+def existing_files(paths):
+    """Return the subset of paths that exist, listing each directory only once."""
+    names_by_dir = {}
+    for directory in {os.path.dirname(path) for path in paths}:
+        try:
+            with os.scandir(directory or '.') as entries:
+                names_by_dir[directory] = {entry.name for entry in entries if entry.is_file()}
+        except OSError:
+            names_by_dir[directory] = set()
+    return {path for path in paths if os.path.basename(path) in names_by_dir[os.path.dirname(path)]}
+
+def generate_font(charmap_file, output_file, font_name, format="ttf", adjustments_file=None, hint=None):
+    """Generate a font file from character mappings.
+
+    Glyphs are auto-hinted when hint is True, or when hint is None and the
+    format is in HINT_FORMATS.
+    """
+    if hint is None:
+        hint = format in HINT_FORMATS
+    
     print("\n=== FONT GENERATION STARTED ===")
     print(f"Character map file: {charmap_file}")
     print(f"Output file: {output_file}.{format}")
     print(f"Font name: {font_name}")
+    print(f"Auto-hinting: {'on' if hint else 'off'}")
     
     # Load character mappings
-    with open(charmap_file, 'r') as f:
-        char_data = json.load(f)
+    with open(charmap_file, 'rb') as f:
+        char_data = _loads(f.read())
     
     print(f"Loaded {len(char_data)} character mappings")
     
+    # Resolve code points once for all later lookups
+    for char_mapping in char_data:
+        char_mapping["unicode"] = ord(char_mapping["char"])
+    
     # Load adjustments if provided
     adjustments = {}
     if adjustments_file and os.path.exists(adjustments_file):
-        with open(adjustments_file, 'r') as f:
-            adjustments = json.load(f)
+        with open(adjustments_file, 'rb') as f:
+            adjustments = _loads(f.read())
         print(f"SUCCESS: Loaded adjustments from {adjustments_file}")
-        print(f"Adjustments content: {json.dumps(adjustments, indent=2)}")
+        if DEBUG:
+            print(f"Adjustments content: {json.dumps(adjustments, indent=2)}")
     else:
         print(f"WARNING: No adjustments file found at {adjustments_file}")
     
@@ -248,7 +484,8 @@ def generate_font(charmap_file, output_file, font_name, format="ttf", adjustment
     print(f"Optical size: {optical_size}pt (factor: {size_factor})")
     
     if char_positions:
-        print(f"Character positions: {json.dumps(char_positions, indent=2)}")
+        if DEBUG:
+            print(f"Character positions: {json.dumps(char_positions, indent=2)}")
     else:
         print("No individual character positions defined")
         
@@ -270,142 +507,188 @@ def generate_font(charmap_file, output_file, font_name, format="ttf", adjustment
     font.version = "1.0"
     
     # Set comprehensive typographic metrics
-    font.em = TYPEFACE_METRICS['units_per_em']
-    font.ascent = TYPEFACE_METRICS['ascender']
-    font.descent = TYPEFACE_METRICS['descender']
-    font.hhea_ascent = TYPEFACE_METRICS['ascender']
-    font.hhea_descent = TYPEFACE_METRICS['descender']
-    font.hhea_linegap = TYPEFACE_METRICS['line_gap']
-    font.os2_winascent = TYPEFACE_METRICS['ascender']
-    font.os2_windescent = TYPEFACE_METRICS['descender']
-    font.os2_typoascent = TYPEFACE_METRICS['ascender']
-    font.os2_typodescent = TYPEFACE_METRICS['descender']
-    font.os2_typolinegap = TYPEFACE_METRICS['line_gap']
+    apply_typeface_metrics(font)
+    
+    # Outline extents per character, measured once and reused for spacing and kerning
+    bbox_cache = {}
     
-    # First pass: create all characters in the font
+    # Loop-invariant metrics, computed once rather than per glyph
+    default_width = TYPEFACE_METRICS['default_width']
+    base_width_by_class = {
+        'narrow': int(default_width * TYPEFACE_METRICS['narrow_width']),
+        'medium': int(default_width * TYPEFACE_METRICS['medium_width']),
+        'wide': int(default_width * TYPEFACE_METRICS['wide_width']),
+    }
+    default_spacing = TYPEFACE_METRICS['default_spacing']
+    initial_width_by_class = {
+        width_class: int(base_width * char_width_scaling) + default_spacing
+        for width_class, base_width in base_width_by_class.items()
+    }
+    spacing_adjustment = int(letter_spacing * letter_spacing_factor)
+    total_vertical_adjust = baseline_offset * baseline_offset_factor
+    
+    # Skip characters whose image doesn't exist
+    existing_paths = existing_files([m["path"] for m in char_data])
+    valid_data = []
     for char_mapping in char_data:
+        if char_mapping["path"] in existing_paths:
+            valid_data.append(char_mapping)
+        else:
+            print(f"Warning: Image for '{char_mapping['char']}' not found at {char_mapping['path']}")
+    
+    # Trace uncached character images up front in parallel worker processes
+    temp_trace_dir = None
+    try:
+        trace_dir, temp_trace_dir = open_trace_dir()
+        traced_outlines, ready_outlines, blank_outlines = pretrace_glyphs([m["path"] for m in valid_data], trace_dir)
+    except OSError as e:
+        print(f"Warning: Could not trace glyphs ahead of time: {e}")
+        traced_outlines, ready_outlines, blank_outlines = {}, set(), set()
+    
+    # Create each character and apply all adjustments to it
+    for char_mapping in valid_data:
         char = char_mapping["char"]
         char_path = char_mapping["path"]
-        unicode_value = ord(char)
-        
-        # Skip if image doesn't exist
-        if not os.path.exists(char_path):
-            print(f"Warning: Image for '{char}' not found at {char_path}")
-            continue
+        unicode_value = char_mapping["unicode"]
         
         # Create a new glyph with the appropriate unicode value
         glyph = font.createChar(unicode_value)
         
-        # Set width based on character class
-        width_class = get_character_width(char)
-        if width_class == 'narrow':
-            base_width = int(TYPEFACE_METRICS['default_width'] * TYPEFACE_METRICS['narrow_width'])
-        elif width_class == 'wide':
-            base_width = int(TYPEFACE_METRICS['default_width'] * TYPEFACE_METRICS['wide_width'])
-        else:
-            base_width = int(TYPEFACE_METRICS['default_width'] * TYPEFACE_METRICS['medium_width'])
-        
-        # Apply width scaling and spacing
-        glyph.width = int(base_width * char_width_scaling) + TYPEFACE_METRICS['default_spacing']
-    
-    # Second pass: apply all adjustments to each glyph
-    for char_mapping in char_data:
-        char = char_mapping["char"]
-        unicode_value = ord(char)
-        
-        # Skip if character wasn't created
-        if unicode_value not in font:
-            continue
-        
-        glyph = font[unicode_value]
-        char_path = char_mapping["path"]
+        # Width based on character class, with width scaling and spacing applied
+        initial_width = initial_width_by_class[get_character_width(char)]
         
         # Import the image into the glyph
         try:
             # Clear any existing contours
             glyph.clear()
             
-            # Import the image
-            glyph.importOutlines(char_path)
+            # Import the cached outline, or import and trace the image here
+            outline_path = traced_outlines.get(char_path)
+            if outline_path in blank_outlines:
+                # A worker already traced this image; tracing it again won't find an outline
+                print(f"Warning: Tracing '{char}' from {char_path} produced no outline")
+            elif outline_path not in ready_outlines or not load_cached_outline(glyph, outline_path):
+                glyph.importOutlines(char_path)
+                glyph.autoTrace()  # Trace the bitmap
+                # Only cache real outlines, so a failed trace is retried next run
+                if glyph_extents(glyph) is None:
+                    print(f"Warning: Tracing '{char}' from {char_path} produced no outline")
+                elif outline_path:
+                    # The font doesn't depend on the cache, so a failed write only costs a retrace
+                    try:
+                        save_outline(glyph, outline_path)
+                    except OSError as e:
+                        print(f"Warning: Could not cache the outline for '{char}': {e}")
             
             # Adjust the glyph metrics
-            glyph.autoTrace()  # Trace the bitmap
-            glyph.autoHint()   # Add hints
+            if hint:
+                glyph.autoHint()   # Add hints
             glyph.round()      # Round to integers
             
-            # Apply overshoot for round characters
-            apply_overshoot(glyph, char)
-            
-            # Apply dynamic side bearings
-            dynamic_side_bearings(glyph, char)
-            
             # Check for per-character position adjustment
             char_position = char_positions.get(char)
+            if char_position and DEBUG:
+                print(f"Found custom position for '{char}': x={char_position.get('x', 0)}, y={char_position.get('y', 0)}")
             
-            # Apply character-specific vertical position adjustment if available
+            # Combine overshoot for round characters with the vertical position
+            # adjustment so the outline is translated only once
+            vertical_shift = overshoot_offset(char)
             if char_position:
-                print(f"Found custom position for '{char}': x={char_position.get('x', 0)}, y={char_position.get('y', 0)}")
-                
-                # Apply Y adjustment (vertical positioning)
+                # Apply character-specific vertical adjustment (Y positioning) if available
                 if 'y' in char_position:
                     char_y_adjust = float(char_position['y']) * position_factor
-                    print(f"Applying character-specific vertical adjustment to '{char}': {char_y_adjust}")
-                    glyph.transform([1, 0, 0, 1, 0, char_y_adjust])
-                
+                    vertical_shift += char_y_adjust
+                    if DEBUG:
+                        print(f"Applying character-specific vertical adjustment to '{char}': {char_y_adjust}")
+            elif baseline_offset != 0:
+                # If no character-specific position, apply global baseline adjustment
+                vertical_shift += total_vertical_adjust
+                if DEBUG:
+                    print(f"Applied global baseline adjustment to '{char}': vertical={total_vertical_adjust}")
+            if vertical_shift:
+                glyph.transform((1, 0, 0, 1, 0, vertical_shift))
+            
+            # Measure the outline once; later steps only translate it horizontally
+            extents = glyph_extents(glyph)
+            bbox_cache[char] = extents
+            
+            # Work out dynamic side bearings and the final width, then set them on the glyph once
+            left_bearing = None
+            width = initial_width
+            metrics = dynamic_side_bearings(glyph, char, bbox_cache)
+            if metrics is not None:
+                left_bearing, _, width = metrics
+            
+            if char_position:
                 # Handle X adjustment through glyph width and left/right side bearings
                 if 'x' in char_position:
                     char_x_adjust = float(char_position['x']) * 0.4
-                    print(f"Applying character-specific horizontal adjustment to '{char}': {char_x_adjust}")
-                    glyph.left_side_bearing += int(char_x_adjust)
-                    glyph.width = int(glyph.width * char_width_scaling) + int(letter_spacing * letter_spacing_factor)
+                    if DEBUG:
+                        print(f"Applying character-specific horizontal adjustment to '{char}': {char_x_adjust}")
+                    if left_bearing is None:
+                        left_bearing = glyph.left_side_bearing
+                    left_bearing += int(char_x_adjust)
+                    width = int(width * char_width_scaling) + spacing_adjustment
             else:
-                # If no character-specific position, apply global baseline adjustment
-                if baseline_offset != 0:
-                    total_vertical_adjust = baseline_offset * baseline_offset_factor
-                    glyph.transform([1, 0, 0, 1, 0, total_vertical_adjust])
-                    print(f"Applied global baseline adjustment to '{char}': vertical={total_vertical_adjust}")
-                
                 # Apply global letter spacing
-                spacing_adjustment = int(letter_spacing * letter_spacing_factor)
-                glyph.width = int(glyph.width * char_width_scaling) + spacing_adjustment
-                print(f"Character '{char}': width={glyph.width}")
+                width = int(width * char_width_scaling) + spacing_adjustment
+                if DEBUG:
+                    print(f"Character '{char}': width={width}")
+            
+            if left_bearing is not None:
+                glyph.left_side_bearing = left_bearing
+            glyph.width = int(width)
             
-            print(f"Successfully imported '{char}' from {char_path}")
+            # Carry the cached extents along with the final outline position
+            if extents is not None and left_bearing is not None:
+                min_x, max_x, min_y, max_y = extents
+                bbox_cache[char] = (left_bearing, left_bearing + (max_x - min_x), min_y, max_y)
+            
+            if DEBUG:
+                print(f"Successfully imported '{char}' from {char_path}")
         except Exception as e:
             print(f"Error importing '{char}' from {char_path}: {e}")
+            glyph.width = initial_width
+            bbox_cache[char] = glyph_extents(glyph)
+    
+    # Drop per-run outlines, or keep the persistent trace cache bounded
+    if temp_trace_dir is not None:
+        temp_trace_dir.cleanup()
+    elif traced_outlines:
+        try:
+            prune_trace_cache(TRACE_CACHE_DIR, TRACE_CACHE_MAX_ENTRIES)
+        except OSError as e:
+            print(f"Warning: Could not prune trace cache at {TRACE_CACHE_DIR}: {e}")
     
     # === DYNAMIC KERNING FOR 'I' PAIRS ===
-    print("\n=== DYNAMIC KERNING FOR 'I' PAIRS ===")
-    try:
-        # Create a lookup for kerning
-        lookup = font.addLookup("kern", "gpos_pair", (), (("kern", (("latn", ("dflt")),)),))
-        font.addLookupSubtable("kern", "kern-1")
-        I_pairs = [chr(c) for c in range(65, 91)]  # A-Z
-        threshold = 30
-        for neighbor in I_pairs:
-            if ord('I') in font and ord(neighbor) in font:
-                glyph_I = font[ord('I')]
-                glyph_N = font[ord(neighbor)]
-                # Get rightmost point of I
-                try:
-                    I_contours = [c for c in glyph_I.foreground]
-                    N_contours = [c for c in glyph_N.foreground]
-                    if not I_contours or not N_contours:
-                        continue
-                    I_max_x = max(point.x for contour in I_contours for point in contour)
-                    N_min_x = min(point.x for contour in N_contours for point in contour)
-                    # Calculate distance between glyphs (assuming 0,0 origin for each)
-                    distance = N_min_x + glyph_I.width - I_max_x
-                    if distance < threshold:
-                        kerning_value = threshold - distance
-                        # Add positive kerning to separate
-                        glyph_I.addPosSub("kern-1", neighbor, int(kerning_value), 0, 0, 0, 0, 0, 0, 0)
-                        print(f"Added dynamic kerning for 'I{neighbor}' with value {int(kerning_value)} (distance={distance})")
-                except Exception as e:
-                    print(f"Error in dynamic kerning for I{neighbor}: {e}")
-        print("Dynamic kerning for 'I' pairs applied.")
-    except Exception as e:
-        print(f"Error applying dynamic kerning for 'I' pairs: {e}")
+    # Only runs when the font has an 'I' with an outline
+    I_extents = bbox_cache.get('I')
+    if I_extents is not None:
+        print("\n=== DYNAMIC KERNING FOR 'I' PAIRS ===")
+        try:
+            glyph_I = font[ord('I')]
+            I_max_x = I_extents[1]
+            I_width = glyph_I.width
+            threshold = 30
+            # Leftmost point of every neighbor against the rightmost point of I,
+            # i.e. the distance between glyphs (assuming 0,0 origin for each)
+            distances = [(neighbor, bbox_cache[neighbor][0] + I_width - I_max_x)
+                         for neighbor in A_TO_Z if bbox_cache.get(neighbor) is not None]
+            # Collect the pairs first and add them to the font in one go
+            kern_pairs = []
+            for neighbor, distance in distances:
+                if distance >= threshold:
+                    continue
+                kerning_value = threshold - distance
+                # Add positive kerning to separate
+                kern_pairs.append((glyph_I.glyphname, font[ord(neighbor)].glyphname, int(kerning_value)))
+                if DEBUG:
+                    print(f"Added dynamic kerning for 'I{neighbor}' with value {int(kerning_value)} (distance={distance})")
+            if kern_pairs:
+                merge_kerning(font, kern_pairs)
+            print("Dynamic kerning for 'I' pairs applied.")
+        except Exception as e:
+            print(f"Error applying dynamic kerning for 'I' pairs: {e}")
     
     # Add default glyphs if needed (like space)
     if 32 not in font:  # ASCII space
@@ -425,8 +708,9 @@ def generate_font(charmap_file, output_file, font_name, format="ttf", adjustment
         print(f"Kerning pairs: {len(kerning_pairs)} pairs with factor {kerning_factor}")
     if char_positions:
         print(f"Per-character positions: {len(char_positions)} characters with custom positions")
-        for char, pos in char_positions.items():
-            print(f"  - '{char}': x={pos.get('x', 0)}, y={pos.get('y', 0)} -> Vertical offset: {float(pos.get('y', 0)) * position_factor} units")
+        if DEBUG:
+            for char, pos in char_positions.items():
+                print(f"  - '{char}': x={pos.get('x', 0)}, y={pos.get('y', 0)} -> Vertical offset: {float(pos.get('y', 0)) * position_factor} units")
     
     # Generate the font file
     output_path = f"{output_file}.{format}"
@@ -437,14 +721,27 @@ def generate_font(charmap_file, output_file, font_name, format="ttf", adjustment
     print(f"Generated font file: {output_path} ({os.path.getsize(output_path)} bytes)")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 4:
-        print("Usage: fontforge -script generate_font.py <charmap_file> <output_file> <font_name> [<format>] [<adjustments_file>]")
+    if len(sys.argv) == 4 and sys.argv[1] == "--trace":
+        try:
+            trace_glyph(sys.argv[2], sys.argv[3])
+        except Exception as e:
+            print(f"Error tracing {sys.argv[2]}: {e}")
+            sys.exit(1)
+        sys.exit(0)
+    
+    options = {arg for arg in sys.argv[1:] if arg.startswith("--")}
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    
+    # --hint and --no-hint are mutually exclusive, and there are no other options
+    if len(args) < 3 or len(options) > 1 or not options <= {"--hint", "--no-hint"}:
+        print("Usage: fontforge -script generate_font.py [--hint | --no-hint] <charmap_file> <output_file> <font_name> [<format>] [<adjustments_file>]")
         sys.exit(1)
     
-    charmap_file = sys.argv[1]
-    output_file = sys.argv[2]
-    font_name = sys.argv[3]
-    format = sys.argv[4] if len(sys.argv) > 4 else "ttf"
-    adjustments_file = sys.argv[5] if len(sys.argv) > 5 else None
+    charmap_file = args[0]
+    output_file = args[1]
+    font_name = args[2]
+    format = args[3] if len(args) > 3 else "ttf"
+    adjustments_file = args[4] if len(args) > 4 else None
+    hint = False if "--no-hint" in options else True if "--hint" in options else None
     
-    generate_font(charmap_file, output_file, font_name, format, adjustments_file) 
\ No newline at end of file
+    generate_font(charmap_file, output_file, font_name, format, adjustments_file, hint) 
\ No newline at end of file